@@ -0,0 +1,179 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def available_encoders(gzip_level: int = 6, brotli_quality: int = 4, zstd_level: int = 3
+                       ) -> dict[str, Callable[[bytes], bytes]]:
+    """Encoders by content coding, in server preference order. brotli and zstandard are optional."""
+    encoders = {}
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        # A ZstdCompressor must not be used by two threads at once, and large bodies are
+        # compressed in worker threads: keep one per thread.
+        local = threading.local()
+
+        def compress_zstd(body: bytes) -> bytes:
+            compressor = getattr(local, 'compressor', None)
+            if compressor is None:
+                compressor = local.compressor = zstandard.ZstdCompressor(level=zstd_level)
+            return compressor.compress(body)
+
+        encoders['zstd'] = compress_zstd
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        encoders['br'] = lambda body: brotli.compress(body, quality=brotli_quality)
+    encoders['gzip'] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return encoders
+
+
+def negotiate(accept_encoding: str, available) -> str | None:
+    """The acceptable coding with the highest q-value; ties go to the server preference order."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, *params = part.strip().lower().split(';')
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            weights[coding.strip()] = q
+
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _digest(body: bytes) -> bytes:
+    # sha256 is hardware-accelerated on current CPUs and faster than blake2b there.
+    return hashlib.sha256(body).digest()
+
+
+class CompressedCache:
+    """Compressed variants of recent bodies, keyed by body digest and coding, bounded in bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[tuple[bytes, str], bytes] = OrderedDict()
+
+    def get(self, key: tuple[bytes, str]) -> bytes | None:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: tuple[bytes, str], body: bytes) -> None:
+        if len(body) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """Compresses complete response bodies with gzip, brotli or zstd.
+
+    Streaming responses (more than one body message), server-sent events and responses that
+    already carry a Content-Encoding are passed through. Bodies of at least `thread_threshold`
+    bytes are compressed in a worker thread. Compressed GET 200 responses are cached by the
+    digest of the raw body, so a hot page is compressed once per coding.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, thread_threshold: int = 64 * 1024,
+                 cache_bytes: int = 32 * 1024 * 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_threshold = thread_threshold
+        self.encoders = available_encoders(gzip_level, brotli_quality, zstd_level)
+        self.cache = CompressedCache(cache_bytes) if cache_bytes > 0 else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get('accept-encoding', ''), self.encoders)
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+        passthrough = False
+
+        async def wrapped(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                if 'content-encoding' in headers or headers.get('content-type', '').startswith('text/event-stream'):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+            elif message['type'] == 'http.response.body':
+                if message.get('more_body', False):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                else:
+                    await self._send_compressed(scope, start, message.get('body', b''), coding, send)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, wrapped)
+
+    async def _send_compressed(self, scope: Scope, start: Message, body: bytes, coding: str, send: Send) -> None:
+        headers = MutableHeaders(raw=list(start['headers']))
+        start['headers'] = headers.raw
+        headers.add_vary_header('Accept-Encoding')
+        if len(body) < self.minimum_size:
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        cacheable = self.cache is not None and self._cacheable(scope, start, headers)
+        key = (await self._run(_digest, body), coding) if cacheable else None
+        compressed = self.cache.get(key) if cacheable else None
+        if compressed is None:
+            compressed = await self._run(self.encoders[coding], body)
+            if cacheable:
+                self.cache.put(key, compressed)
+
+        headers['Content-Encoding'] = coding
+        headers['Content-Length'] = str(len(compressed))
+        await send(start)
+        await send({'type': 'http.response.body', 'body': compressed})
+
+    async def _run(self, func: Callable[[bytes], bytes], body: bytes) -> bytes:
+        if len(body) >= self.thread_threshold:
+            return await anyio.to_thread.run_sync(func, body)
+        return func(body)
+
+    @staticmethod
+    def _cacheable(scope: Scope, start: Message, headers: MutableHeaders) -> bool:
+        cache_control = headers.get('cache-control', '').lower()
+        return (scope['method'] == 'GET' and start['status'] == 200 and 'set-cookie' not in headers
+                and 'no-store' not in cache_control and 'private' not in cache_control)
@@ -1,9 +1,16 @@
 from typing import AsyncGenerator
+from fastapi import Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.backend.db import async_session_maker
+from app.config import Settings
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+def get_settings(request: Request) -> Settings:
+    # The settings the app was created with, which may differ from app.config.settings.
+    return request.app.state.settings
@@ -0,0 +1,285 @@
+import abc
+import asyncio
+import json
+import logging
+import time
+import zlib
+from collections import deque
+
+from sqlalchemy import Sequence
+from sqlalchemy.engine import make_url
+
+from app import queries
+from app.backend import db
+from app.backend.db import Base
+from app.config import Settings
+from app.models.category import Category
+from app.models.products import Product
+
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_EVENT_COLUMNS = (Product.id, Product.slug, Product.name, Product.price, Product.stock,
+                         Product.category_id, Product.is_active)
+CATEGORY_EVENT_COLUMNS = (Category.id, Category.slug, Category.name, Category.parent_id, Category.is_active)
+
+# Event ids shared by all workers of the Postgres broker.
+CHANGE_ID_SEQUENCE = Sequence('catalog_change_ids', metadata=Base.metadata)
+
+
+# Events name the categories they touch in `categories`; `publish()` replaces that with
+# `category_ids`, every ancestor of those categories, which subscriptions filter on.
+
+def product_event(action: str, product, previous_category_id: int | None = None) -> dict:
+    data = {column.key: getattr(product, column.key) for column in PRODUCT_EVENT_COLUMNS}
+    categories = [data['category_id']]
+    if previous_category_id is not None and previous_category_id != data['category_id']:
+        # Moved: subscribers of the old category learn that the product left it.
+        data['previous_category_id'] = previous_category_id
+        categories.append(previous_category_id)
+    return {'type': f'product.{action}', 'categories': categories, 'data': data}
+
+
+def category_event(action: str, category, previous_parent_id: int | None = None) -> dict:
+    data = {column.key: getattr(category, column.key) for column in CATEGORY_EVENT_COLUMNS}
+    categories = [data['id']]
+    if previous_parent_id is not None and previous_parent_id != data['parent_id']:
+        data['previous_parent_id'] = previous_parent_id
+        categories.append(previous_parent_id)
+    return {'type': f'category.{action}', 'categories': categories, 'data': data}
+
+
+class Subscription:
+    """A bounded per-connection queue of events.
+
+    A subscriber that falls behind is not allowed to block publishers: once its queue is
+    full it stops receiving events, and `get()` returns None after the backlog is drained.
+    The client then reconnects with Last-Event-ID and catches up from the broker history.
+    """
+
+    def __init__(self, category_ids: set[int] | None, maxsize: int):
+        self.category_ids = category_ids
+        self.overflowed = False
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize)
+
+    def push(self, event: dict) -> None:
+        if self.overflowed:
+            return
+        event_category_ids = event['category_ids']
+        if (self.category_ids is not None and event_category_ids is not None
+                and self.category_ids.isdisjoint(event_category_ids)):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self) -> dict | None:
+        if self.overflowed and self._queue.empty():
+            return None
+        return await self._queue.get()
+
+
+def _reset_event() -> dict:
+    return {'id': None, 'type': 'reset', 'category_ids': None, 'data': {}}
+
+
+class Broker(abc.ABC):
+    """Fans change events out to subscriptions and keeps a short history for resuming.
+
+    Subclasses deliver events in increasing id order, so the history stays sorted.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._history: deque[dict] = deque(maxlen=history)
+        self._subscriptions: set[Subscription] = set()
+        # Events with ids up to the horizon may be missing from the history.
+        self._horizon = 0
+
+    def _dispatch(self, event: dict) -> None:
+        if len(self._history) == self._history.maxlen:
+            self._horizon = self._history[0]['id']
+        self._history.append(event)
+        for subscription in self._subscriptions:
+            subscription.push(event)
+
+    def subscribe(self, category_ids: set[int] | None = None, last_event_id: int | None = None) -> Subscription:
+        subscription = Subscription(category_ids, self.queue_size)
+        if last_event_id is not None:
+            if last_event_id < self._horizon:
+                # Part of what the client missed is not in the history, it has to reload.
+                subscription.push(_reset_event())
+            for event in self._history:
+                if event['id'] > last_event_id:
+                    subscription.push(event)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def reset_subscriptions(self) -> None:
+        """Tell every current subscriber that it may have missed events and has to reload."""
+        for subscription in self._subscriptions:
+            subscription.push(_reset_event())
+
+    @abc.abstractmethod
+    async def publish(self, events: list[dict]) -> None:
+        ...
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class InProcessBroker(Broker):
+    """Delivers events to the subscribers of the current worker only.
+
+    Event ids are microsecond timestamps made strictly increasing, so ids issued before a
+    restart are below the new horizon.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._last_id = 0
+        self._horizon = self._next_id()
+
+    def _next_id(self) -> int:
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    async def publish(self, events: list[dict]) -> None:
+        for event in events:
+            self._dispatch({'id': self._next_id(), **event})
+
+
+class PostgresBroker(Broker):
+    """Delivers events to every worker through Postgres LISTEN/NOTIFY.
+
+    Each worker holds one dedicated asyncpg connection that both listens and notifies, so
+    a worker receives its own events the same way as everybody else's. Ids come from the
+    `catalog_change_ids` sequence while a transaction-level advisory lock is held, so they
+    increase in commit order, which is the order NOTIFY delivers in, on every worker.
+    """
+
+    def __init__(self, dsn: str, channel: str = 'catalog_changes', reconnect_interval: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_interval = reconnect_interval
+        self._connection = None
+        self._lock = asyncio.Lock()
+        self._reconnect_task: asyncio.Task | None = None
+        self._lock_key = zlib.crc32(channel.encode())
+
+    async def start(self) -> None:
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.add_listener(self.channel, self._on_notify)
+            # Events published while this worker was not listening are not in its history.
+            last_value, is_called = await connection.fetchrow(
+                f'SELECT last_value, is_called FROM {CHANGE_ID_SEQUENCE.name}')
+            self._horizon = max(self._horizon, last_value if is_called else 0)
+        except BaseException:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._on_terminate)
+        self._connection = connection
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+        if self._connection is not None:
+            self._connection.remove_termination_listener(self._on_terminate)
+            await self._connection.close()
+            self._connection = None
+
+    async def publish(self, events: list[dict]) -> None:
+        if self._connection is None:
+            # The events are lost for every worker; at least this worker's subscribers learn of it.
+            self.reset_subscriptions()
+            raise ConnectionError('Change feed broker is not connected')
+        async with self._lock, self._connection.transaction():
+            # Held until commit: no other worker can take newer ids and commit first.
+            await self._connection.execute('SELECT pg_advisory_xact_lock($1)', self._lock_key)
+            ids = await self._connection.fetch('SELECT nextval($1::regclass) FROM generate_series(1, $2)',
+                                               CHANGE_ID_SEQUENCE.name, len(events))
+            payloads = [json.dumps({'id': event_id, **event}, default=str)
+                        for event_id, event in zip(sorted(row[0] for row in ids), events)]
+            await self._connection.execute('SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload',
+                                           self.channel, payloads)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._dispatch(json.loads(payload))
+
+    def _on_terminate(self, connection) -> None:
+        logger.warning('Change feed listener connection lost, reconnecting')
+        self._connection = None
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while self._connection is None:
+            try:
+                await self.start()
+            except Exception:
+                logger.exception('Change feed reconnect failed')
+                await asyncio.sleep(self.reconnect_interval)
+        # Events of other workers sent while this one was not listening never reached its subscribers.
+        self.reset_subscriptions()
+
+
+broker: Broker = InProcessBroker()
+
+
+def configure_broker(settings: Settings) -> Broker:
+    global broker
+    if settings.events_broker == 'postgres':
+        dsn = make_url(settings.database_url).set(drivername='postgresql').render_as_string(hide_password=False)
+        broker = PostgresBroker(dsn, history=settings.events_history, queue_size=settings.events_queue_size)
+    else:
+        broker = InProcessBroker(history=settings.events_history, queue_size=settings.events_queue_size)
+    return broker
+
+
+async def _with_ancestors(events: tuple[dict, ...]) -> list[dict]:
+    # Resolved when the event is published, so categories created or moved after a client
+    # subscribed are matched by their current position in the tree.
+    category_ids = {category_id for event in events for category_id in event['categories'] if category_id is not None}
+    try:
+        async with db.async_session_maker() as session:
+            rows = await session.execute(queries.CATEGORY_ANCESTOR_IDS, {'category_ids': list(category_ids)})
+    except Exception:
+        logger.exception('Failed to resolve event categories, events go to every subscriber')
+        ancestors = None
+    else:
+        ancestors: dict[int, set[int]] = {}
+        for origin, ancestor in rows:
+            ancestors.setdefault(origin, set()).add(ancestor)
+
+    resolved = []
+    for event in events:
+        event = dict(event)
+        categories = event.pop('categories')
+        if ancestors is None:
+            event['category_ids'] = None
+        else:
+            event['category_ids'] = sorted({ancestor for category_id in categories
+                                            for ancestor in ancestors.get(category_id, {category_id})
+                                            if ancestor is not None})
+        resolved.append(event)
+    return resolved
+
+
+async def publish(*events: dict) -> None:
+    # Called after the commit: a failure here must not turn a successful write into an error.
+    if not events:
+        return
+    try:
+        await broker.publish(await _with_ancestors(events))
+    except Exception:
+        logger.exception('Failed to publish %d change events', len(events))
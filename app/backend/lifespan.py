@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import signal
+import threading
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app import queries
+from app.backend import db, events
+from app.backend.revocation import revocations
+from app.config import Settings
+from app.routers.auth import bcrypt_context
+
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_connection(connection: AsyncConnection) -> None:
+    # A server-side cursor prepares the statement (and runs asyncpg type introspection)
+    # without pulling the whole result set into memory.
+    for statement, parameters in queries.WARM_UP:
+        result = await connection.stream(statement, parameters)
+        await result.close()
+    await connection.rollback()
+
+
+async def warm_up(connections: int) -> None:
+    opened = await asyncio.gather(*(db.engine.connect() for _ in range(connections)), return_exceptions=True)
+    try:
+        for connection in opened:
+            if isinstance(connection, BaseException):
+                raise connection
+        await asyncio.gather(*(_warm_connection(connection) for connection in opened))
+    finally:
+        for connection in opened:
+            if isinstance(connection, AsyncConnection):
+                await connection.close()
+
+    await asyncio.to_thread(bcrypt_context.dummy_verify)
+
+    async with db.async_session_maker() as session:
+        await revocations.refresh(session)
+
+
+async def _retry(step: Callable[[], Awaitable[None]], name: str, interval: float) -> None:
+    while True:
+        try:
+            await step()
+        except Exception:
+            logger.exception('%s failed, retrying in %s s', name, interval)
+            await asyncio.sleep(interval)
+        else:
+            return
+
+
+async def _start_until_ready(app: FastAPI, settings: Settings) -> None:
+    # The database may still be starting: both steps are retried instead of failing the startup.
+    await _retry(events.broker.start, 'Change feed broker start', settings.warmup_retry_interval)
+    await _retry(lambda: warm_up(settings.warmup_connections), 'Warm-up', settings.warmup_retry_interval)
+    app.state.ready = True
+
+
+async def _refresh_revocations(settings: Settings) -> None:
+    while True:
+        await asyncio.sleep(settings.revocation_refresh_interval)
+        try:
+            async with db.async_session_maker() as session:
+                await revocations.refresh(session)
+        except Exception:
+            logger.exception('Token revocation refresh failed')
+
+
+def _install_drain_handler(app: FastAPI, delay: float) -> Callable[[], None]:
+    """Turn readiness off as soon as SIGTERM arrives, and hand the signal on to the server
+    after `delay` seconds, so load balancers stop routing here while the server still accepts.
+
+    The server's own handler is installed before the lifespan starts. Returns a function that
+    restores it.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # Signal handlers can only be set from the main thread (not the case under TestClient).
+        return lambda: None
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return lambda: None
+    loop = asyncio.get_running_loop()
+
+    def handle(signum, frame):
+        if app.state.ready and delay > 0:
+            app.state.ready = False
+            logger.info('SIGTERM received, readiness is off, shutting down in %s s', delay)
+            loop.call_later(delay, previous, signum, frame)
+        else:
+            # Not ready yet, or a second SIGTERM during the drain delay: stop right away.
+            app.state.ready = False
+            previous(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle)
+    return lambda: signal.signal(signal.SIGTERM, previous)
+
+
+def create_lifespan(settings: Settings):
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        app.state.ready = False
+        revocations.token_lifetime = settings.access_token_expire_minutes * 60
+        startup_task = asyncio.create_task(_start_until_ready(app, settings))
+        refresh_task = asyncio.create_task(_refresh_revocations(settings))
+        restore_signal_handler = _install_drain_handler(app, settings.shutdown_drain_delay)
+        try:
+            await asyncio.wait({startup_task}, timeout=settings.warmup_timeout)
+            yield
+        finally:
+            # The server has already closed its listeners and drained in-flight requests
+            # here; readiness was turned off by the SIGTERM handler before that.
+            app.state.ready = False
+            restore_signal_handler()
+            startup_task.cancel()
+            refresh_task.cancel()
+            await events.broker.stop()
+            await db.engine.dispose()
+
+    return lifespan
@@ -0,0 +1,172 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.backend.rate_limit import Budget, MemoryBackend
+from app.routers.auth import get_current_user
+
+
+_sql_trace: ContextVar[list | None] = ContextVar('sql_trace', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _sql_trace.get() is not None:
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _sql_trace.get()
+    if trace is not None and conn.info.get('profile_started'):
+        started = conn.info['profile_started'].pop()
+        trace.append({'statement': statement, 'duration_ms': round((time.perf_counter() - started) * 1000, 3)})
+
+
+class StackSampler:
+    """Samples the stack of one thread from a background thread.
+
+    The result is in the collapsed format ("root;caller;callee count" per line) that
+    flamegraph.pl and speedscope read. It samples the whole event loop thread, so other
+    requests running concurrently on the same worker show up as well.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+
+
+class ProfileStore:
+    def __init__(self, max_size: int = 50):
+        self.max_size = max_size
+        self._profiles: OrderedDict[str, dict] = OrderedDict()
+
+    def add(self, profile: dict) -> None:
+        self._profiles[profile['id']] = profile
+        while len(self._profiles) > self.max_size:
+            self._profiles.popitem(last=False)
+
+    def get(self, profile_id: str) -> dict | None:
+        return self._profiles.get(profile_id)
+
+    def list(self) -> list[dict]:
+        return [{key: profile[key] for key in ('id', 'method', 'path', 'started_at', 'duration_ms')}
+                for profile in reversed(self._profiles.values())]
+
+
+profiles = ProfileStore()
+
+
+class ProfilingMiddleware:
+    """Profiles single requests on demand, for administrators only.
+
+    A request is profiled when it carries `X-Profile: 1` or `?_profile=1` together with an
+    admin bearer token. Only one request per worker is profiled at a time, and at most one
+    every `min_interval` seconds; other requests pass through untouched. The profile is
+    stored in `profiles` and its id is returned in the `X-Profile-Id` response header.
+    """
+
+    def __init__(self, app: ASGIApp, min_interval: float = 10.0, sample_interval: float = 0.002):
+        self.app = app
+        self.sample_interval = sample_interval
+        self._budget = Budget(1, 1 / min_interval)
+        self._limiter = MemoryBackend(max_keys=1)
+        self._active = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not self._requested(scope) or not await self._is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if self._active or await self._limiter.consume('profile', self._budget) > 0:
+            await self.app(scope, receive, self._with_header(send, b'x-profile-skipped', b'rate-limited'))
+            return
+
+        profile_id = uuid.uuid4().hex
+        trace: list[dict] = []
+        token = _sql_trace.set(trace)
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        self._active = True
+        started_at = time.time()
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, self._with_header(send, b'x-profile-id', profile_id.encode()))
+        finally:
+            sampler.stop()
+            self._active = False
+            _sql_trace.reset(token)
+            profiles.add({
+                'id': profile_id,
+                'method': scope['method'],
+                'path': scope['path'],
+                'started_at': started_at,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                'sample_interval_ms': self.sample_interval * 1000,
+                'sql': trace,
+                'sql_total_ms': round(sum(query['duration_ms'] for query in trace), 3),
+                'collapsed': sampler.collapsed(),
+            })
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        for name, value in scope['headers']:
+            if name == b'x-profile' and value == b'1':
+                return True
+        return parse_qs(scope.get('query_string', b'').decode('latin-1')).get('_profile') == ['1']
+
+    @staticmethod
+    async def _is_admin(scope: Scope) -> bool:
+        for name, value in scope['headers']:
+            if name == b'authorization':
+                scheme, _, token = value.decode('latin-1').partition(' ')
+                if scheme.lower() != 'bearer':
+                    return False
+                try:
+                    user = await get_current_user(token)
+                except HTTPException:
+                    return False
+                return bool(user.get('is_admin'))
+        return False
+
+    @staticmethod
+    def _with_header(send: Send, name: bytes, value: bytes) -> Send:
+        async def wrapped(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                message['headers'] = [*message.get('headers', []), (name, value)]
+            await send(message)
+        return wrapped
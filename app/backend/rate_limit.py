@@ -0,0 +1,206 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import jwt
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.routers.auth import SECRET_KEY, ALGORITHM
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Budget:
+    capacity: float
+    refill_rate: float  # tokens per second
+
+
+@dataclass(frozen=True)
+class RouteRule:
+    name: str
+    method: str
+    path: str  # exact match, or a prefix when it ends with "*"
+    per_ip: Budget | None = None
+    per_user: Budget | None = None
+    concurrency: int | None = None
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method != '*' and self.method != method:
+            return False
+        if self.path.endswith('*'):
+            return path.startswith(self.path[:-1])
+        return path == self.path
+
+
+DEFAULT_RULES = (
+    RouteRule('login', 'POST', '/auth/token', per_ip=Budget(5, 5 / 60), concurrency=8),
+    RouteRule('signup', 'POST', '/auth/', per_ip=Budget(3, 3 / 60)),
+    RouteRule('catalog_sync', 'POST', '/products/sync', per_user=Budget(10, 10 / 60), concurrency=4),
+    RouteRule('catalog', 'GET', '/products/', per_ip=Budget(30, 10), per_user=Budget(60, 20), concurrency=32),
+    RouteRule('products', 'GET', '/products/*', per_ip=Budget(60, 20), per_user=Budget(120, 40), concurrency=64),
+    RouteRule('changes', 'GET', '/changes/', per_ip=Budget(10, 1), concurrency=1000),
+    RouteRule('default', '*', '*', per_ip=Budget(120, 50), per_user=Budget(240, 100)),
+)
+
+
+class MemoryBackend:
+    """Token buckets in process memory, for a single worker."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def consume(self, key: str, budget: Budget, cost: float = 1.0) -> float:
+        # No await between the read and the write, so no lock is needed.
+        now = time.monotonic()
+        state = self._buckets.get(key)
+        if state is None:
+            tokens = budget.capacity
+        else:
+            tokens = min(budget.capacity, state[0] + (now - state[1]) * budget.refill_rate)
+            self._buckets.move_to_end(key)
+
+        if tokens >= cost:
+            tokens -= cost
+            retry_after = 0.0
+        else:
+            retry_after = (cost - tokens) / budget.refill_rate
+
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+-- The server clock, so buckets refill the same way whichever host calls the script.
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return tostring(retry_after)
+"""
+
+
+class RedisBackend:
+    """Token buckets shared between workers through any Redis-protocol server.
+
+    The bucket update runs as one Lua script, so it is atomic on the server, and it reads
+    the server's clock (Redis 5+), so hosts with skewed clocks share buckets correctly.
+    `client` is a `redis.asyncio.Redis`-compatible client (a fakeredis client works too).
+    """
+
+    def __init__(self, client, fail_open: bool = True):
+        self.client = client
+        self.fail_open = fail_open
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisBackend':
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url), **kwargs)
+
+    async def consume(self, key: str, budget: Budget, cost: float = 1.0) -> float:
+        try:
+            result = await self._script(keys=[key], args=[budget.capacity, budget.refill_rate, cost])
+        except Exception:
+            if not self.fail_open:
+                raise
+            logger.warning('Rate limit backend is unavailable, request admitted', exc_info=True)
+            return 0.0
+        return float(result)
+
+
+def _too_many(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={'detail': detail},
+        headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """Per-IP and per-user token buckets plus concurrency caps for expensive routes.
+
+    The user is taken from the `id` claim of a bearer token, so no database lookup
+    happens before a request is admitted. Requests over budget get 429, requests
+    that would exceed a route's concurrency cap are shed with 503.
+    """
+
+    def __init__(self, app: ASGIApp, rules=DEFAULT_RULES, backend=None, key_prefix: str = 'rl'):
+        self.app = app
+        self.rules = tuple(rules)
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.key_prefix = key_prefix
+        self._active: dict[str, int] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        rule = next((r for r in self.rules if r.matches(scope['method'], scope['path'])), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        retry_after = 0.0
+        if rule.per_ip is not None:
+            client = scope.get('client')
+            ip = client[0] if client else 'unknown'
+            key = f'{self.key_prefix}:{rule.name}:ip:{ip}'
+            retry_after = max(retry_after, await self.backend.consume(key, rule.per_ip))
+        if rule.per_user is not None:
+            user_id = _user_id(scope)
+            if user_id is not None:
+                key = f'{self.key_prefix}:{rule.name}:user:{user_id}'
+                retry_after = max(retry_after, await self.backend.consume(key, rule.per_user))
+        if retry_after > 0:
+            await _too_many(429, 'Слишком много запросов', retry_after)(scope, receive, send)
+            return
+
+        if rule.concurrency is None:
+            await self.app(scope, receive, send)
+            return
+
+        active = self._active.get(rule.name, 0)
+        if active >= rule.concurrency:
+            await _too_many(503, 'Сервер перегружен, повторите позже', 1)(scope, receive, send)
+            return
+        self._active[rule.name] = active + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._active[rule.name] -= 1
+
+
+def _user_id(scope: Scope) -> int | None:
+    for name, value in scope['headers']:
+        if name == b'authorization':
+            scheme, _, token = value.decode('latin-1').partition(' ')
+            if scheme.lower() != 'bearer' or not token:
+                return None
+            try:
+                return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get('id')
+            except jwt.PyJWTError:
+                return None
+    return None
@@ -0,0 +1,69 @@
+import time
+
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import queries
+from app.config import settings
+from app.models.token_revocation import TokenRevocation
+
+
+class RevocationList:
+    """In-process mirror of the `token_revocations` table.
+
+    A revocation rejects every token of the user issued before `not_before`. Entries older
+    than the token lifetime are dropped, because every token they could reject has expired.
+    The table is re-read incrementally by `not_before`, with an overlap so that rows committed
+    late by other workers are not missed. Rows past the token lifetime (plus the overlap, for
+    clock skew between workers) are deleted at most once per `prune_interval` seconds.
+    """
+
+    def __init__(self, token_lifetime: float, overlap: float = 60.0, prune_interval: float = 300.0):
+        self.token_lifetime = token_lifetime
+        self.overlap = overlap
+        self.prune_interval = prune_interval
+        self._not_before: dict[int, float] = {}
+        self._refreshed_at: float | None = None
+        self._pruned_at = 0.0
+
+    def is_revoked(self, user_id: int, issued_at: float | None) -> bool:
+        not_before = self._not_before.get(user_id)
+        if not_before is None:
+            return False
+        return issued_at is None or issued_at < not_before
+
+    def add(self, user_id: int, not_before: float) -> None:
+        if not_before > self._not_before.get(user_id, 0.0):
+            self._not_before[user_id] = not_before
+
+    async def refresh(self, db: AsyncSession) -> None:
+        now = time.time()
+        horizon = now - self.token_lifetime
+        since = horizon if self._refreshed_at is None else max(horizon, self._refreshed_at - self.overlap)
+
+        rows = await db.execute(queries.REVOCATIONS_SINCE, {'since': since})
+        for user_id, not_before in rows:
+            self.add(user_id, not_before)
+
+        self._not_before = {user_id: not_before for user_id, not_before in self._not_before.items()
+                            if not_before > horizon}
+        self._refreshed_at = now
+
+        if now - self._pruned_at >= self.prune_interval:
+            await db.execute(delete(TokenRevocation).where(TokenRevocation.not_before < horizon - self.overlap))
+            await db.commit()
+            self._pruned_at = now
+
+
+revocations = RevocationList(token_lifetime=settings.access_token_expire_minutes * 60)
+
+
+async def revoke_tokens(db: AsyncSession, user_id: int) -> float:
+    """Add a revocation to the current transaction and return its `not_before`.
+
+    Call `revocations.add(user_id, not_before)` after the commit so this worker sees it
+    immediately; other workers pick it up on their next refresh.
+    """
+    not_before = time.time()
+    await db.execute(insert(TokenRevocation).values(user_id=user_id, not_before=not_before))
+    return not_before
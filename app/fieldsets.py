@@ -0,0 +1,46 @@
+"""Sparse fieldsets: `?fields=id,name,price` on listing endpoints.
+
+The requested fields are checked against a per-model allow-list and pushed down into
+the SELECT column list, so unrequested columns are neither read nor serialized.
+"""
+import functools
+from typing import Annotated
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Select
+
+
+PRODUCT_FIELDS = ('id', 'name', 'slug', 'description', 'price', 'image_url', 'stock',
+                  'supplier_id', 'category_id', 'rating', 'is_active')
+
+REVIEW_FIELDS = ('id', 'user_id', 'product_id', 'comment', 'comment_date', 'grade', 'is_active')
+
+
+def fieldset(allowed: tuple[str, ...]):
+    """Dependency parsing `?fields=`; None means the full object."""
+
+    def dependency(fields: Annotated[str | None, Query(description=f'Поля через запятую: {", ".join(allowed)}')] = None
+                   ) -> tuple[str, ...] | None:
+        if fields is None:
+            return None
+        requested = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = requested.difference(allowed)
+        if not requested or unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f'Недопустимые поля: {", ".join(sorted(unknown)) or fields}. Доступные: {", ".join(allowed)}'
+            )
+        # Allow-list order, so every combination maps to one cached statement.
+        return tuple(field for field in allowed if field in requested)
+
+    return dependency
+
+
+product_fields = fieldset(PRODUCT_FIELDS)
+review_fields = fieldset(REVIEW_FIELDS)
+
+
+@functools.lru_cache(maxsize=256)
+def narrow(stmt: Select, model, fields: tuple[str, ...]) -> Select:
+    """`stmt` with its columns replaced by `fields` of `model`, built once per combination."""
+    return stmt.with_only_columns(*(getattr(model, field) for field in fields))
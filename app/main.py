@@ -1,15 +1,72 @@
-from fastapi import FastAPI
-from app.routers import category, products, auth, permission, reviews
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse
 
+from app.config import Settings, settings as default_settings
 
-app = FastAPI()
 
-@app.get('/')
-async def welcome() -> dict:
-    return {"message": "My e-commerce app"}
+def create_app(settings: Settings | None = None) -> FastAPI:
+    from app.backend import db, events, profiling
+    from app.backend.compression import CompressionMiddleware
+    from app.backend.lifespan import create_lifespan
+    from app.backend.rate_limit import RateLimitMiddleware, MemoryBackend, RedisBackend
+    from app.routers import category, products, auth, permission, reviews, changes, profiles
 
-app.include_router(auth.router)
-app.include_router(category.router)
-app.include_router(products.router)
-app.include_router(reviews.router)
-app.include_router(permission.router)
+    if settings is None:
+        settings = default_settings
+    else:
+        db.configure_engine(settings)
+    events.configure_broker(settings)
+
+    app = FastAPI(lifespan=create_lifespan(settings))
+    app.state.ready = False
+    app.state.settings = settings
+
+    @app.get('/')
+    async def welcome() -> dict:
+        return {"message": "My e-commerce app"}
+
+    @app.get('/health/ready', include_in_schema=False)
+    async def health_ready():
+        if app.state.ready:
+            return {'status': 'ready'}
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={'status': 'starting'})
+
+    app.include_router(auth.router)
+    app.include_router(category.router)
+    app.include_router(products.router)
+    app.include_router(reviews.router)
+    app.include_router(permission.router)
+    app.include_router(changes.router)
+    app.include_router(profiles.router)
+
+    if settings.compression_enabled:
+        app.add_middleware(CompressionMiddleware,
+                           minimum_size=settings.compression_minimum_size,
+                           thread_threshold=settings.compression_thread_threshold,
+                           cache_bytes=settings.compression_cache_bytes,
+                           gzip_level=settings.compression_gzip_level,
+                           brotli_quality=settings.compression_brotli_quality,
+                           zstd_level=settings.compression_zstd_level)
+
+    if settings.profiling_enabled:
+        profiling.profiles.max_size = settings.profiling_max_stored
+        app.add_middleware(profiling.ProfilingMiddleware,
+                           min_interval=settings.profiling_min_interval,
+                           sample_interval=settings.profiling_sample_interval)
+
+    if settings.rate_limit_enabled:
+        if settings.rate_limit_redis_url:
+            backend = RedisBackend.from_url(settings.rate_limit_redis_url)
+        else:
+            backend = MemoryBackend()
+        app.add_middleware(RateLimitMiddleware, backend=backend)
+
+    return app
+
+
+def __getattr__(name: str):
+    # `uvicorn app.main:app` keeps working, but the app is only built when it is asked for.
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,28 @@
+"""Add product sync_deactivated
+
+Revision ID: 5d2f7b8c1e04
+Revises: c3a91d0e5b27
+Create Date: 2026-10-19 12:20:44.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2f7b8c1e04'
+down_revision: Union[str, None] = 'c3a91d0e5b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sync_deactivated', sa.Boolean(), server_default='false', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'sync_deactivated')
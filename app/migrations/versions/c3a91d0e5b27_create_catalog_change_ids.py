@@ -0,0 +1,28 @@
+"""Create catalog change id sequence
+
+Revision ID: c3a91d0e5b27
+Revises: 4ebbd41a2301
+Create Date: 2026-10-19 11:02:17.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91d0e5b27'
+down_revision: Union[str, None] = '4ebbd41a2301'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(sa.schema.CreateSequence(sa.Sequence('catalog_change_ids')))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(sa.schema.DropSequence(sa.Sequence('catalog_change_ids')))
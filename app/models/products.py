@@ -1,10 +1,11 @@
 from app.backend.db import Base
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import deferred, relationship
 
 
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (UniqueConstraint('supplier_id', 'external_sku'),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String)
@@ -17,6 +18,13 @@ class Product(Base):
     category_id = Column(Integer, ForeignKey('categories.id'))
     rating = Column(Float)
     is_active = Column(Boolean, default=True)
+    # Supplier sync bookkeeping: not loaded with the object, so it never reaches API responses.
+    external_sku = deferred(Column(String, nullable=True), raiseload=True)
+    # Hash of the last synced feed row; cleared by local edits so the next sync applies the feed again.
+    content_hash = deferred(Column(String, nullable=True), raiseload=True)
+    # Set only when the sync deactivated the product: only then does a later feed reactivate it.
+    sync_deactivated = deferred(Column(Boolean, nullable=False, default=False, server_default='false'),
+                                raiseload=True)
 
     category = relationship('Category', back_populates='products')
     reviews = relationship('Review', back_populates='product')
\ No newline at end of file
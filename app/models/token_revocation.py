@@ -0,0 +1,10 @@
+from app.backend.db import Base
+from sqlalchemy import Column, Integer, Float, ForeignKey
+
+
+class TokenRevocation(Base):
+    __tablename__ = 'token_revocations'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('user.id'))
+    not_before = Column(Float, index=True)
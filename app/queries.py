@@ -0,0 +1,82 @@
+"""Hot read queries of the routers.
+
+Statements are built once at import time with named bound parameters and executed as
+`db.scalar(queries.CATEGORY_BY_SLUG, {'slug': slug})`. A request then skips building the
+`select()` and generating its cache key (the key is memoized on the statement object), and
+the SQL text is the same on every call, so asyncpg reuses its prepared statements. List
+parameters are bound as one array (`= ANY(:ids)`) rather than an expanding `IN (...)`,
+whose SQL text changes with the length of the list.
+
+`lambda_stmt` was measured too and turned out slower than plain `select()` for statements
+with parameters, see benchmarks/bench_queries.py.
+"""
+from sqlalchemy import ARRAY, Integer, any_, bindparam, select
+
+from app.models.category import Category
+from app.models.products import Product
+from app.models.reviews import Review
+from app.models.token_revocation import TokenRevocation
+from app.models.user import User
+
+
+ACTIVE_PRODUCTS = select(Product).where(Product.is_active == True, Product.stock > 0)
+
+ACTIVE_PRODUCTS_IN_CATEGORIES = select(Product).where(
+    Product.category_id == any_(bindparam('category_ids', type_=ARRAY(Integer))),
+    Product.is_active == True,
+    Product.stock > 0)
+
+ACTIVE_PRODUCT_BY_SLUG = select(Product).where(Product.slug == bindparam('slug'),
+                                               Product.is_active == True,
+                                               Product.stock > 0)
+
+PRODUCT_BY_SLUG = select(Product).where(Product.slug == bindparam('slug'))
+
+PRODUCT_BY_ID = select(Product).where(Product.id == bindparam('product_id'))
+
+ACTIVE_CATEGORIES = select(Category).where(Category.is_active == True)
+
+CATEGORY_BY_SLUG = select(Category).where(Category.slug == bindparam('slug'))
+
+CATEGORY_BY_ID = select(Category).where(Category.id == bindparam('category_id'))
+
+SUBCATEGORY_IDS = select(Category.id).where(Category.parent_id == bindparam('parent_id'))
+
+_subtree = select(Category.id).where(Category.id == bindparam('category_id')).cte('category_subtree', recursive=True)
+# UNION rather than UNION ALL, so a parent_id cycle ends the recursion instead of looping.
+_subtree = _subtree.union(select(Category.id).where(Category.parent_id == _subtree.c.id))
+CATEGORY_SUBTREE_IDS = select(_subtree.c.id)
+
+# (origin, ancestor) pairs for every category in `category_ids`, the category itself included.
+_ancestors = (select(Category.id.label('origin'), Category.id, Category.parent_id)
+              .where(Category.id == any_(bindparam('category_ids', type_=ARRAY(Integer))))
+              .cte('category_ancestors', recursive=True))
+_ancestors = _ancestors.union(select(_ancestors.c.origin, Category.id, Category.parent_id)
+                              .where(Category.id == _ancestors.c.parent_id))
+CATEGORY_ANCESTOR_IDS = select(_ancestors.c.origin, _ancestors.c.id)
+
+ACTIVE_REVIEWS = select(Review).where(Review.is_active == True)
+
+ACTIVE_PRODUCT_REVIEWS = select(Review).where(Review.is_active == True,
+                                              Review.product_id == bindparam('product_id'))
+
+REVIEW_BY_ID = select(Review).where(Review.id == bindparam('review_id'))
+
+USER_BY_ID = select(User).where(User.id == bindparam('user_id'))
+
+USER_BY_USERNAME = select(User).where(User.username == bindparam('username'))
+
+REVOCATIONS_SINCE = select(TokenRevocation.user_id, TokenRevocation.not_before).where(
+    TokenRevocation.not_before > bindparam('since'))
+
+
+# Statements and sample parameters prepared on every pooled connection at startup.
+WARM_UP = (
+    (ACTIVE_PRODUCTS, {}),
+    (ACTIVE_PRODUCTS_IN_CATEGORIES, {'category_ids': [0]}),
+    (ACTIVE_PRODUCT_BY_SLUG, {'slug': ''}),
+    (ACTIVE_CATEGORIES, {}),
+    (CATEGORY_BY_SLUG, {'slug': ''}),
+    (SUBCATEGORY_IDS, {'parent_id': 0}),
+    (USER_BY_USERNAME, {'username': ''}),
+)
@@ -10,7 +10,10 @@ import jwt
 
 from app.models.user import User
 from app.schemas import CreateUser
-from app.backend.db_depends import get_db
+from app.backend.db_depends import get_db, get_settings
+from app.backend.revocation import revocations
+from app.config import Settings
+from app import queries
 
 
 SECRET_KEY = "a10dd846ef16125290e0f31120eeaa403d14b68622975c4acc100903ae62cab4"
@@ -22,7 +25,7 @@ bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
 
 async def authenticate_user(db: Annotated[AsyncSession, Depends(get_db)], username: str, password: str):
-    user = await db.scalar(select(User).where(User.username == username))
+    user = await db.scalar(queries.USER_BY_USERNAME, {'username': username})
     if not user or not bcrypt_context.verify(password, user.hashed_password) or user.is_active == False:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,6 +42,7 @@ async def create_access_token(username: str, user_id: int, is_admin: bool, is_su
         'is_admin': is_admin,
         'is_supplier': is_supplier,
         'is_customer': is_customer,
+        'iat': datetime.now(timezone.utc).timestamp(),
         'exp': datetime.now(timezone.utc) + expires_delta
     }
     payload['exp'] = int(payload['exp'].timestamp())
@@ -53,6 +57,7 @@ async def get_current_user(token: Annotated[AsyncSession, Depends(oauth2_scheme)
         is_supplier: bool | None = payload.get('is_supplier')
         is_customer: bool | None = payload.get('is_customer')
         expire: int | None = payload.get('exp')
+        issued_at: float | None = payload.get('iat')
 
         if username is None or user_id is None:
             raise HTTPException(
@@ -80,6 +85,12 @@ async def get_current_user(token: Annotated[AsyncSession, Depends(oauth2_scheme)
                 detail='Срок действия токена истек!'
             )
 
+        if revocations.is_revoked(user_id, issued_at):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail='Токен отозван, войдите заново'
+            )
+
         return {
             'username': username,
             'id': user_id,
@@ -92,7 +103,7 @@ async def get_current_user(token: Annotated[AsyncSession, Depends(oauth2_scheme)
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Срок действия токена истек!'
         )
-    except jwt.exceptions:
+    except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Не удалось проверить пользователя'
@@ -115,11 +126,12 @@ async def create_user(db: Annotated[AsyncSession, Depends(get_db)], create_user:
 
 
 @router.post('/token')
-async def login(db: Annotated[AsyncSession, Depends(get_db)], form_data: Annotated[OAuth2PasswordRequestForm, Depends()]):
+async def login(db: Annotated[AsyncSession, Depends(get_db)], form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+                settings: Annotated[Settings, Depends(get_settings)]):
     user = await authenticate_user(db, form_data.username, form_data.password)
 
     token = await create_access_token(user.username, user.id, user.is_admin, user.is_supplier, user.is_customer,
-                                expires_delta=timedelta(minutes=20))
+                                expires_delta=timedelta(minutes=settings.access_token_expire_minutes))
 
     return {
         'access_token': token,
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, status, HTTPException
 from typing import Annotated, List
-from sqlalchemy import insert, select, delete
+from sqlalchemy import insert, select, delete, update
 from slugify import slugify
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -9,13 +9,15 @@ from app.schemas import CreateCategory
 from app.models.category import Category
 from app.models.products import Product
 from app.routers.auth import get_current_user
+from app.backend import events
+from app import queries
 
 
 router = APIRouter(prefix='/categories', tags=['Категории товаров'])
 
 @router.get('/', summary='Получение всех категорий')
 async def get_all_categories(db: Annotated[AsyncSession, Depends(get_db)]):
-    categories = await db.scalars(select(Category).where(Category.is_active == True))
+    categories = await db.scalars(queries.ACTIVE_CATEGORIES)
     return categories.all()
 
 
@@ -23,10 +25,13 @@ async def get_all_categories(db: Annotated[AsyncSession, Depends(get_db)]):
 async def create_category(db: Annotated[AsyncSession, Depends(get_db)], create_category: CreateCategory, get_user: Annotated[dict, Depends(get_current_user)]):
     if get_user.get('is_admin'):
 
-        await db.execute(insert(Category).values(name=create_category.name,
-                                                 parent_id=create_category.parent_id,
-                                                 slug=slugify(create_category.name)))
+        category = await db.execute(insert(Category).values(name=create_category.name,
+                                                            parent_id=create_category.parent_id,
+                                                            slug=slugify(create_category.name))
+                                    .returning(*events.CATEGORY_EVENT_COLUMNS))
+        category = category.one()
         await db.commit()
+        await events.publish(events.category_event('created', category))
         return {
             'status_code': status.HTTP_201_CREATED,
             'transaction': 'Successful'
@@ -41,18 +46,20 @@ async def create_category(db: Annotated[AsyncSession, Depends(get_db)], create_c
 @router.put('/{category_slug}', summary='Изменение категории')
 async def update_category(db: Annotated[AsyncSession, Depends(get_db)], category_slug: str, update_category: CreateCategory, get_user: Annotated[dict, Depends(get_current_user)]):
     if get_user.get('is_admin'):
-        category = await db.scalar(select(Category).where(Category.slug == category_slug))
+        category = await db.scalar(queries.CATEGORY_BY_SLUG, {'slug': category_slug})
         if category is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='There is no category found'
             )
 
+        previous_parent_id = category.parent_id
         category.name = update_category.name
         category.slug = slugify(update_category.name)
         category.parent_id = update_category.parent_id
 
         await db.commit()
+        await events.publish(events.category_event('updated', category, previous_parent_id))
 
         return {
             'status_code': status.HTTP_200_OK,
@@ -68,18 +75,35 @@ async def update_category(db: Annotated[AsyncSession, Depends(get_db)], category
 @router.delete('/{category_slug}', summary='сделать категорию неактивной')
 async def delete_category(db: Annotated[AsyncSession, Depends(get_db)], category_id: int, get_user: Annotated[dict, Depends(get_current_user)]):
     if get_user.get('is_admin'):
-        category = await db.scalar(select(Category).where(Category.id == category_id))
+        category = await db.scalar(queries.CATEGORY_BY_ID, {'category_id': category_id})
         if category is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='There is no category found'
             )
-        category.is_active = False
+        subtree = queries.CATEGORY_SUBTREE_IDS.params(category_id=category_id)
+        categories = await db.execute(update(Category).where(Category.id.in_(subtree),
+                                                             Category.is_active == True)
+                                      .values(is_active=False)
+                                      .returning(*events.CATEGORY_EVENT_COLUMNS)
+                                      .execution_options(synchronize_session=False))
+        categories = categories.all()
+        products = await db.execute(update(Product).where(Product.category_id.in_(subtree),
+                                                          (Product.is_active == True)
+                                                          | (Product.sync_deactivated == True))
+                                    .values(is_active=False, sync_deactivated=False)
+                                    .returning(*events.PRODUCT_EVENT_COLUMNS)
+                                    .execution_options(synchronize_session=False))
+        products = products.all()
         await db.commit()
+        await events.publish(*(events.category_event('deactivated', category) for category in categories),
+                             *(events.product_event('deactivated', product) for product in products))
 
         return {
             'status_code': status.HTTP_200_OK,
-            'transaction': 'Category delete is successful'
+            'transaction': 'Category delete is successful',
+            'categories': len(categories),
+            'products': len(products)
         }
     else:
         raise HTTPException(
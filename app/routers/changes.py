@@ -0,0 +1,51 @@
+import asyncio
+import json
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import StreamingResponse
+
+from app.backend import events
+from app.backend.db_depends import get_settings
+from app.config import Settings
+
+
+router = APIRouter(prefix='/changes', tags=['Изменения'])
+
+
+def _format(event: dict) -> str:
+    lines = [] if event['id'] is None else [f"id: {event['id']}"]
+    lines.append(f"event: {event['type']}")
+    lines.append(f"data: {json.dumps(event['data'], default=str, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+@router.get('/', summary='Поток изменений товаров и категорий (Server-Sent Events)')
+async def change_feed(settings: Annotated[Settings, Depends(get_settings)],
+                      category: Annotated[list[int] | None, Query()] = None,
+                      after: int | None = None,
+                      last_event_id: Annotated[int | None, Header()] = None):
+    # Events carry the ancestors of their categories, so a category also matches its whole subtree.
+    category_ids = set(category) if category else None
+    if last_event_id is None:
+        last_event_id = after
+
+    async def stream():
+        subscription = events.broker.subscribe(category_ids, last_event_id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.events_heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                if event is None:
+                    # The client fell behind; closing makes it reconnect with Last-Event-ID.
+                    return
+                yield _format(event)
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
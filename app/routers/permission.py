@@ -6,15 +6,17 @@ from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.backend.db_depends import get_db
+from app.backend.revocation import revocations, revoke_tokens
 from app.models.user import User
 from .auth import get_current_user
+from app import queries
 
 router = APIRouter(prefix='/permission', tags=['permission'])
 
 @router.patch('/')
 async def supplier_permission(db: Annotated[AsyncSession, Depends(get_db)], get_user: Annotated[dict, Depends(get_current_user)], user_id: int):
     if get_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
+        user = await db.scalar(queries.USER_BY_ID, {'user_id': user_id})
 
         if not user or not user.is_active:
             raise HTTPException(
@@ -24,7 +26,9 @@ async def supplier_permission(db: Annotated[AsyncSession, Depends(get_db)], get_
         if user.is_supplier:
             await db.execute(update(User).where(User.id == user_id).values(is_supplier=False,
                                                                            is_customer=True))
+            not_before = await revoke_tokens(db, user_id)
             await db.commit()
+            revocations.add(user_id, not_before)
             return {
                 'status_code': status.HTTP_200_OK,
                 'detail': 'Пользователь больше не является поставщиком'
@@ -32,7 +36,9 @@ async def supplier_permission(db: Annotated[AsyncSession, Depends(get_db)], get_
         else:
             await db.execute(update(User).where(User.id == user_id).values(is_supplier=True,
                                                                            is_customer=False))
+            not_before = await revoke_tokens(db, user_id)
             await db.commit()
+            revocations.add(user_id, not_before)
             return {
                 'status_code': status.HTTP_200_OK,
                 'detail': 'Пользователь теперь поставщик'
@@ -47,7 +53,7 @@ async def supplier_permission(db: Annotated[AsyncSession, Depends(get_db)], get_
 @router.delete('/delete')
 async def delete_user(db: Annotated[AsyncSession, Depends(get_db)], get_user: Annotated[dict, Depends(get_current_user)], user_id: int):
     if get_user.get('is_admin'):
-        user = await db.scalar(select(User).where(User.id == user_id))
+        user = await db.scalar(queries.USER_BY_ID, {'user_id': user_id})
 
         if not user:
             raise HTTPException(
@@ -63,7 +69,9 @@ async def delete_user(db: Annotated[AsyncSession, Depends(get_db)], get_user: An
 
         if user.is_active:
             await db.execute(update(User).where(User.id == user_id).values(is_active=False))
+            not_before = await revoke_tokens(db, user_id)
             await db.commit()
+            revocations.add(user_id, not_before)
             return {
                 'status_code': status.HTTP_200_OK,
                 'detail': 'Пользователь удален'
@@ -1,20 +1,32 @@
+import hashlib
+import json
+
 from fastapi import APIRouter, Depends, status, HTTPException
 from typing import Annotated, List
 from slugify import slugify
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.backend.db_depends import get_db
-from sqlalchemy import select, insert, update, delete
-from app.schemas import CreateProduct
+from app.backend import events
+from sqlalchemy import select, insert, update, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.schemas import CreateProduct, ProductSelection, BulkRecategorize, BulkPriceAdjust, CatalogSync, SyncProduct
 from app.models import *
 from app.routers.auth import get_current_user
+from app import queries
+from app.fieldsets import narrow, product_fields
 
 router = APIRouter(prefix="/products", tags=["Товары"])
 
+SYNC_CHUNK_SIZE = 1000
+
 @router.get('/', summary='Получение всех товаров')
-async def all_products(db: Annotated[AsyncSession, Depends(get_db)]):
-    products = await db.scalars(select(Product).where(Product.is_active == True,
-                                                      Product.stock > 0))
+async def all_products(db: Annotated[AsyncSession, Depends(get_db)],
+                       fields: Annotated[tuple[str, ...] | None, Depends(product_fields)]):
+    if fields:
+        rows = await db.execute(narrow(queries.ACTIVE_PRODUCTS, Product, fields))
+        return rows.mappings().all()
+    products = await db.scalars(queries.ACTIVE_PRODUCTS)
     if products is None:
         return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -25,13 +37,13 @@ async def all_products(db: Annotated[AsyncSession, Depends(get_db)]):
 @router.post('/', status_code=status.HTTP_201_CREATED, summary='Создание товара')
 async def create_product(db: Annotated[AsyncSession, Depends(get_db)], create_product: CreateProduct, get_user: Annotated[dict, Depends(get_current_user)]):
     if get_user.get('is_admin') or get_user.get('is_supplier'):
-        category = await db.scalar(select(Category).where(Category.id == create_product.category))
+        category = await db.scalar(queries.CATEGORY_BY_ID, {'category_id': create_product.category})
         if category is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail='There is no category found'
             )
-        await db.execute(insert(Product).values(name=create_product.name,
+        product = await db.execute(insert(Product).values(name=create_product.name,
                                                 description=create_product.description,
                                                 price=create_product.price,
                                                 image_url=create_product.image_url,
@@ -39,8 +51,11 @@ async def create_product(db: Annotated[AsyncSession, Depends(get_db)], create_pr
                                                 category_id=create_product.category,
                                                 rating=0.0,
                                                 slug=slugify(create_product.name),
-                                                supplier_id=get_user.get('id')))
+                                                supplier_id=get_user.get('id'))
+                                   .returning(*events.PRODUCT_EVENT_COLUMNS))
+        product = product.one()
         await db.commit()
+        await events.publish(events.product_event('created', product))
         return {
             'status_code': status.HTTP_201_CREATED,
             'transaction': 'Successful'
@@ -53,18 +68,22 @@ async def create_product(db: Annotated[AsyncSession, Depends(get_db)], create_pr
 
 
 @router.get('/{category_slug}', summary='Получение товаров по категории')
-async def product_by_category(db: Annotated[AsyncSession, Depends(get_db)], category_slug: str):
-    category = await db.scalar(select(Category).where(Category.slug == category_slug))
+async def product_by_category(db: Annotated[AsyncSession, Depends(get_db)], category_slug: str,
+                              fields: Annotated[tuple[str, ...] | None, Depends(product_fields)]):
+    category = await db.scalar(queries.CATEGORY_BY_SLUG, {'slug': category_slug})
     if category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Category not found'
         )
-    subcategories = await db.scalars(select(Category).where(Category.parent_id == category.id))
-    categories_and_subcategories = [category.id] + [i.id for i in subcategories.all()]
-    products_category = await db.scalars(
-        select(Product).where(Product.category_id.in_(categories_and_subcategories), Product.is_active == True,
-                              Product.stock > 0))
+    subcategories = await db.scalars(queries.SUBCATEGORY_IDS, {'parent_id': category.id})
+    categories_and_subcategories = [category.id] + subcategories.all()
+    if fields:
+        rows = await db.execute(narrow(queries.ACTIVE_PRODUCTS_IN_CATEGORIES, Product, fields),
+                                {'category_ids': categories_and_subcategories})
+        return rows.mappings().all()
+    products_category = await db.scalars(queries.ACTIVE_PRODUCTS_IN_CATEGORIES,
+                                         {'category_ids': categories_and_subcategories})
     return products_category.all()
 
 
@@ -72,9 +91,7 @@ async def product_by_category(db: Annotated[AsyncSession, Depends(get_db)], cate
 
 @router.get("/detail/{product_slug}", summary='Получение товара')
 async def product_detail(db: Annotated[AsyncSession, Depends(get_db)], product_slug: str):
-    product = await db.scalar(select(Product).where(Product.slug == product_slug,
-                                                    Product.is_active == True,
-                                                    Product.stock > 0))
+    product = await db.scalar(queries.ACTIVE_PRODUCT_BY_SLUG, {'slug': product_slug})
     if product is None:
         return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -85,19 +102,20 @@ async def product_detail(db: Annotated[AsyncSession, Depends(get_db)], product_s
 @router.put('/{product_slug}', summary='Изменение товара')
 async def update_product(db: Annotated[AsyncSession, Depends(get_db)], product_slug: str, updata_product: CreateProduct, get_user: Annotated[dict, Depends(get_current_user)]):
     if get_user.get('is_supplier') or get_user.get('is_admin'):
-        product = await db.scalar(select(Product).where(Product.slug == product_slug))
+        product = await db.scalar(queries.PRODUCT_BY_SLUG, {'slug': product_slug})
         if product is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="There is no product found"
             )
-        if get_user.get('id') == updata_product.supplier_id or get_user.get('is_admin'):
-            category = await db.scalar(select(Category).where(Category.id == updata_product.category))
+        if get_user.get('id') == product.supplier_id or get_user.get('is_admin'):
+            category = await db.scalar(queries.CATEGORY_BY_ID, {'category_id': updata_product.category})
             if category is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail='There is no category found'
                 )
+            previous_category_id = product.category_id
             product.name = updata_product.name
             product.description = updata_product.description
             product.price = updata_product.price
@@ -105,8 +123,10 @@ async def update_product(db: Annotated[AsyncSession, Depends(get_db)], product_s
             product.stock = updata_product.stock
             product.category_id = updata_product.category
             product.slug = slugify(updata_product.name)
+            product.content_hash = None
 
             await db.commit()
+            await events.publish(events.product_event('updated', product, previous_category_id))
             return {
                 'status_code': status.HTTP_200_OK,
                 'transaction': 'Product update is successful'
@@ -124,7 +144,7 @@ async def update_product(db: Annotated[AsyncSession, Depends(get_db)], product_s
 
 @router.delete('/{product_slug}', summary='Сделать товар неактивным')
 async def delete_product(db: Annotated[AsyncSession, Depends(get_db)], product_slug: str, get_user: Annotated[dict, Depends(get_current_user)]):
-    product = await db.scalar(select(Product).where(Product.slug == product_slug))
+    product = await db.scalar(queries.PRODUCT_BY_SLUG, {'slug': product_slug})
     if product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -133,7 +153,9 @@ async def delete_product(db: Annotated[AsyncSession, Depends(get_db)], product_s
     if get_user.get('is_supplier') or get_user.get('is_admin'):
         if get_user.get('id') == product.supplier_id or get_user.get('is_admin'):
             product.is_active = False
+            product.sync_deactivated = False
             await db.commit()
+            await events.publish(events.product_event('deactivated', product))
             return {
                 'status_code': status.HTTP_200_OK,
                 'transaction': 'Product delete is successful'
@@ -149,3 +171,228 @@ async def delete_product(db: Annotated[AsyncSession, Depends(get_db)], product_s
             detail='У вас недостаточно прав для этого действия'
         )
 
+
+def _selection_filter(selection: ProductSelection) -> list:
+    conditions = []
+    if selection.ids is not None:
+        conditions.append(Product.id.in_(selection.ids))
+    if selection.category_id is not None:
+        conditions.append(Product.category_id == selection.category_id)
+    if selection.supplier_id is not None:
+        conditions.append(Product.supplier_id == selection.supplier_id)
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Укажите id товаров или фильтр'
+        )
+    return conditions
+
+
+async def _bulk_update(db: AsyncSession, selection: ProductSelection, action: str, *conditions, **values) -> int:
+    # `conditions` skip rows that already have the new values, so they are neither counted nor published.
+    # The rows are selected (and locked) first, so RETURNING can report the category they had before.
+    previous = (select(Product.id, Product.category_id.label('previous_category_id'))
+                .where(*_selection_filter(selection), *conditions)
+                .with_for_update()
+                .subquery())
+    products = await db.execute(update(Product).where(Product.id == previous.c.id)
+                                .values(content_hash=None, **values)
+                                .returning(*events.PRODUCT_EVENT_COLUMNS, previous.c.previous_category_id)
+                                .execution_options(synchronize_session=False))
+    products = products.all()
+    await db.commit()
+    await events.publish(*(events.product_event(action, product, product.previous_category_id)
+                           for product in products))
+    return len(products)
+
+
+def _require_admin(get_user: dict) -> None:
+    if not get_user.get('is_admin'):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='Для этого вы должны быть администратором.'
+        )
+
+
+@router.patch('/bulk/deactivate', summary='Сделать товары неактивными')
+async def bulk_deactivate(db: Annotated[AsyncSession, Depends(get_db)], selection: ProductSelection, get_user: Annotated[dict, Depends(get_current_user)]):
+    _require_admin(get_user)
+    affected = await _bulk_update(db, selection, 'deactivated',
+                                  (Product.is_active == True) | (Product.sync_deactivated == True),
+                                  is_active=False, sync_deactivated=False)
+    return {
+        'status_code': status.HTTP_200_OK,
+        'affected': affected
+    }
+
+
+@router.patch('/bulk/reactivate', summary='Сделать товары активными')
+async def bulk_reactivate(db: Annotated[AsyncSession, Depends(get_db)], selection: ProductSelection, get_user: Annotated[dict, Depends(get_current_user)]):
+    _require_admin(get_user)
+    affected = await _bulk_update(db, selection, 'reactivated', Product.is_active == False,
+                                  is_active=True, sync_deactivated=False)
+    return {
+        'status_code': status.HTTP_200_OK,
+        'affected': affected
+    }
+
+
+@router.patch('/bulk/category', summary='Перенести товары в другую категорию')
+async def bulk_recategorize(db: Annotated[AsyncSession, Depends(get_db)], recategorize: BulkRecategorize, get_user: Annotated[dict, Depends(get_current_user)]):
+    _require_admin(get_user)
+    category = await db.scalar(queries.CATEGORY_BY_ID, {'category_id': recategorize.category})
+    if category is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='There is no category found'
+        )
+    affected = await _bulk_update(db, recategorize.selection, 'updated',
+                                  Product.category_id.is_distinct_from(recategorize.category),
+                                  category_id=recategorize.category)
+    return {
+        'status_code': status.HTTP_200_OK,
+        'affected': affected
+    }
+
+
+@router.patch('/bulk/price', summary='Изменить цены товаров')
+async def bulk_price_adjust(db: Annotated[AsyncSession, Depends(get_db)], adjust: BulkPriceAdjust, get_user: Annotated[dict, Depends(get_current_user)]):
+    _require_admin(get_user)
+    if adjust.percent is None and adjust.delta is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Укажите percent или delta'
+        )
+    price = Product.price
+    if adjust.percent is not None:
+        price = func.round(price * (1 + adjust.percent / 100))
+    if adjust.delta is not None:
+        price = price + adjust.delta
+    price = func.greatest(price, 0)
+    affected = await _bulk_update(db, adjust.selection, 'updated', Product.price.is_distinct_from(price), price=price)
+    return {
+        'status_code': status.HTTP_200_OK,
+        'affected': affected
+    }
+
+
+def _content_hash(item: SyncProduct) -> str:
+    content = json.dumps(item.model_dump(exclude={'external_sku'}), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+async def _slug_owners(db: AsyncSession, condition) -> dict[str, tuple[int, str]]:
+    owners = await db.execute(select(Product.slug, Product.supplier_id, Product.external_sku).where(condition))
+    return {slug: (owner, sku) for slug, owner, sku in owners}
+
+
+async def _assign_slugs(db: AsyncSession, supplier_id: int, items: list[SyncProduct]) -> dict[str, str]:
+    # Collisions are resolved up front: slugify(name) when it is free, otherwise the SKU is appended,
+    # and if that is taken as well (SKUs differing only in case) a counter: -2, -3, ...
+    candidates = {}
+    for item in items:
+        base = slugify(item.name)
+        candidates[item.external_sku] = (base, f'{base}-{slugify(item.external_sku)}')
+
+    taken = await _slug_owners(db, Product.slug.in_({slug for pair in candidates.values() for slug in pair}))
+    counted_prefixes = set()
+
+    slugs = {}
+    for sku, (name_slug, sku_slug) in candidates.items():
+        owner = (supplier_id, sku)
+        for slug in (name_slug, sku_slug):
+            if taken.get(slug, owner) == owner:
+                break
+        else:
+            if sku_slug not in counted_prefixes:
+                # slugify() output has no LIKE wildcards.
+                taken.update(await _slug_owners(db, Product.slug.like(f'{sku_slug}-%')))
+                counted_prefixes.add(sku_slug)
+            counter = 2
+            while taken.get(f'{sku_slug}-{counter}', owner) != owner:
+                counter += 1
+            slug = f'{sku_slug}-{counter}'
+        taken[slug] = owner
+        slugs[sku] = slug
+    return slugs
+
+
+@router.post('/sync', summary='Синхронизация каталога поставщика')
+async def sync_catalog(db: Annotated[AsyncSession, Depends(get_db)], catalog: CatalogSync, get_user: Annotated[dict, Depends(get_current_user)]):
+    if not (get_user.get('is_supplier') or get_user.get('is_admin')):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='У вас недостаточно прав для этого действия'
+        )
+    supplier_id = get_user.get('id')
+    items = list({item.external_sku: item for item in catalog.upsert}.values())
+
+    category_ids = {item.category for item in items}
+    found = set(await db.scalars(select(Category.id).where(Category.id.in_(category_ids),
+                                                           Category.is_active == True)))
+    if found != category_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'There is no category found: {sorted(category_ids - found)}'
+        )
+
+    slugs = await _assign_slugs(db, supplier_id, items)
+    changes = []
+    for start in range(0, len(items), SYNC_CHUNK_SIZE):
+        chunk = items[start:start + SYNC_CHUNK_SIZE]
+        # Current categories of the products that already exist, for the events of moved products.
+        previous = await db.execute(select(Product.external_sku, Product.category_id)
+                                    .where(Product.supplier_id == supplier_id,
+                                           Product.external_sku.in_([item.external_sku for item in chunk]))
+                                    .with_for_update())
+        previous_categories = dict(previous.all())
+        rows = [{
+            'name': item.name,
+            'description': item.description,
+            'price': item.price,
+            'image_url': item.image_url,
+            'stock': item.stock,
+            'category_id': item.category,
+            'rating': 0.0,
+            'is_active': True,
+            'slug': slugs[item.external_sku],
+            'supplier_id': supplier_id,
+            'external_sku': item.external_sku,
+            'content_hash': _content_hash(item),
+        } for item in chunk]
+        stmt = pg_insert(Product).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Product.supplier_id, Product.external_sku],
+            set_={**{column: stmt.excluded[column] for column in
+                     ('name', 'description', 'price', 'image_url', 'stock', 'category_id', 'content_hash')},
+                  # Products deactivated by an admin or a category cascade stay inactive.
+                  'is_active': Product.is_active | Product.sync_deactivated,
+                  'sync_deactivated': False},
+            # Unchanged rows are skipped by the database and do not show up in RETURNING.
+            where=Product.content_hash.is_distinct_from(stmt.excluded.content_hash) | Product.sync_deactivated,
+        ).returning(literal_column('xmax = 0').label('created'), Product.external_sku, *events.PRODUCT_EVENT_COLUMNS)
+        for product in await db.execute(stmt):
+            changes.append(events.product_event('created' if product.created else 'updated', product,
+                                                previous_categories.get(product.external_sku)))
+
+    created = sum(event['type'] == 'product.created' for event in changes)
+    updated = len(changes) - created
+
+    if catalog.deactivate:
+        deactivated = await db.execute(update(Product).where(Product.supplier_id == supplier_id,
+                                                             Product.external_sku.in_(catalog.deactivate),
+                                                             Product.is_active == True)
+                                       .values(is_active=False, sync_deactivated=True)
+                                       .returning(*events.PRODUCT_EVENT_COLUMNS)
+                                       .execution_options(synchronize_session=False))
+        changes.extend(events.product_event('deactivated', product) for product in deactivated)
+
+    await db.commit()
+    await events.publish(*changes)
+    return {
+        'status_code': status.HTTP_200_OK,
+        'created': created,
+        'updated': updated,
+        'unchanged': len(items) - created - updated,
+        'deactivated': len(changes) - created - updated
+    }
@@ -0,0 +1,45 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.backend.profiling import profiles
+from app.routers.auth import get_current_user
+
+
+router = APIRouter(prefix='/profiles', tags=['Профилирование'])
+
+
+def _admin(get_user: Annotated[dict, Depends(get_current_user)]) -> dict:
+    if not get_user.get('is_admin'):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='У вас нет прав администратора'
+        )
+    return get_user
+
+
+def _profile(profile_id: str) -> dict:
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail='Профиль не найден'
+        )
+    return profile
+
+
+@router.get('/', summary='Последние профили запросов')
+async def list_profiles(get_user: Annotated[dict, Depends(_admin)]):
+    return profiles.list()
+
+
+@router.get('/{profile_id}', summary='Профиль запроса с временем SQL-запросов')
+async def get_profile(profile_id: str, get_user: Annotated[dict, Depends(_admin)]):
+    return _profile(profile_id)
+
+
+@router.get('/{profile_id}/collapsed', response_class=PlainTextResponse,
+            summary='Стеки в формате collapsed для flamegraph.pl / speedscope')
+async def get_profile_collapsed(profile_id: str, get_user: Annotated[dict, Depends(_admin)]):
+    return _profile(profile_id)['collapsed']
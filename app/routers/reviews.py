@@ -12,18 +12,28 @@ from app.models.category import Category
 from app.models.products import Product
 from app.models.reviews import Review
 from app.routers.auth import get_current_user
+from app import queries
+from app.fieldsets import narrow, review_fields
 
 
 router = APIRouter(prefix='/products/reviews', tags=['Отзывы'])
 
 @router.get('/', summary='Получение всех отзывов')
-async def get_all_reviews(db: Annotated[AsyncSession, Depends(get_db)]):
-    comments = await db.scalars(select(Review).where(Review.is_active == True))
+async def get_all_reviews(db: Annotated[AsyncSession, Depends(get_db)],
+                          fields: Annotated[tuple[str, ...] | None, Depends(review_fields)]):
+    if fields:
+        rows = await db.execute(narrow(queries.ACTIVE_REVIEWS, Review, fields))
+        return rows.mappings().all()
+    comments = await db.scalars(queries.ACTIVE_REVIEWS)
     return comments.all()
 
 @router.get('/{product_id}', summary='Получение отзывов о товаре по id')
-async def products_reviews(db: Annotated[AsyncSession, Depends(get_db)], product_id: int):
-    comment = await db.scalars(select(Review).where(Review.is_active == True, Review.product_id == product_id))
+async def products_reviews(db: Annotated[AsyncSession, Depends(get_db)], product_id: int,
+                           fields: Annotated[tuple[str, ...] | None, Depends(review_fields)]):
+    if fields:
+        rows = await db.execute(narrow(queries.ACTIVE_PRODUCT_REVIEWS, Review, fields), {'product_id': product_id})
+        return rows.mappings().all()
+    comment = await db.scalars(queries.ACTIVE_PRODUCT_REVIEWS, {'product_id': product_id})
     return comment.all()
 
 
@@ -35,7 +45,7 @@ async def add_review(db: Annotated[AsyncSession, Depends(get_db)], product_id: i
             detail="Только покупатели могут оставлять отзывы"
         )
 
-    product = await db.scalar(select(Product).where(Product.id == product_id))
+    product = await db.scalar(queries.PRODUCT_BY_ID, {'product_id': product_id})
     if product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -69,13 +79,13 @@ async def delete_reviews(db: Annotated[AsyncSession, Depends(get_db)], product_i
             detail="Только администраторы могут удалять отзывы"
         )
 
-    product = await db.scalar(select(Product).where(Product.id == product_id))
+    product = await db.scalar(queries.PRODUCT_BY_ID, {'product_id': product_id})
     if product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail='Товар не найден'
         )
-    comment = await db.scalar(select(Review).where(Review.id == reviews_id))
+    comment = await db.scalar(queries.REVIEW_BY_ID, {'review_id': reviews_id})
     if comment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -8,6 +8,33 @@ class CreateProduct(BaseModel):
     stock: int
     category: int
 
+class ProductSelection(BaseModel):
+    ids: list[int] | None = None
+    category_id: int | None = None
+    supplier_id: int | None = None
+
+class BulkRecategorize(BaseModel):
+    selection: ProductSelection
+    category: int
+
+class BulkPriceAdjust(BaseModel):
+    selection: ProductSelection
+    percent: float | None = None
+    delta: int | None = None
+
+class SyncProduct(BaseModel):
+    external_sku: str
+    name: str
+    description: str
+    price: int
+    image_url: str
+    stock: int
+    category: int
+
+class CatalogSync(BaseModel):
+    upsert: list[SyncProduct] = []
+    deactivate: list[str] = []
+
 class CreateCategory(BaseModel):
     name: str
     parent_id: int | None = None
@@ -0,0 +1,145 @@
+"""Production server entry point.
+
+    python -m app.serve [--workers N] [--db-connection-budget N] [--server uvicorn|gunicorn] ...
+
+Workers default to the number of CPUs available to the process. The database connection
+budget is the total number of connections all workers together may open; it is split
+evenly and written to DB_POOL_SIZE / DB_MAX_OVERFLOW before the workers start, so every
+worker builds its engine from its own share.
+
+Graceful reload: send SIGHUP to the master process. Both uvicorn (0.30+) and gunicorn then
+start fresh workers and let the old ones finish their requests. --max-requests recycles a
+worker after it has served that many requests.
+
+On SIGTERM a worker first answers /health/ready with 503 for SHUTDOWN_DRAIN_DELAY seconds
+and only then stops accepting, so the load balancer can take it out of rotation first.
+"""
+import argparse
+import importlib.util
+import logging
+import math
+import os
+import sys
+
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def pool_sizes(budget: int, workers: int, reserved_per_worker: int = 0) -> tuple[int, int]:
+    """Split a total connection budget into per-worker (pool_size, max_overflow).
+
+    Every worker needs at least one pooled connection plus its reserved ones, so a budget
+    below `workers * (1 + reserved_per_worker)` is rejected rather than silently exceeded.
+    """
+    needed = workers * (1 + reserved_per_worker)
+    if budget < needed:
+        raise ValueError(f'a database connection budget of {budget} is too small for {workers} workers, '
+                         f'at least {needed} connections are needed')
+    per_worker = budget // workers - reserved_per_worker
+    pool_size = max(1, math.ceil(per_worker * 0.75))
+    return pool_size, per_worker - pool_size
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m app.serve', description='Run the e-commerce API.')
+    parser.add_argument('--server', choices=('uvicorn', 'gunicorn'), default='uvicorn')
+    parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', available_cpus())))
+    parser.add_argument('--db-connection-budget', type=int, default=int(os.getenv('DB_CONNECTION_BUDGET', '40')),
+                        help='total database connections for all workers together')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='restart a worker after this many requests (0 disables)')
+    parser.add_argument('--max-requests-jitter', type=int, default=0, help='gunicorn only')
+    parser.add_argument('--timeout-graceful-shutdown', type=int, default=30)
+    parser.add_argument('--keep-alive', type=int, default=5)
+    parser.add_argument('--reload', action='store_true', help='restart on code changes (development, one worker)')
+    parser.add_argument('--log-level', default='info')
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace) -> None:
+    from app import config
+
+    settings = config.Settings.from_env()
+    reserved = 1 if settings.events_broker == 'postgres' else 0
+    pool_size, max_overflow = pool_sizes(args.db_connection_budget, args.workers, reserved)
+    os.environ['DB_POOL_SIZE'] = str(pool_size)
+    os.environ['DB_MAX_OVERFLOW'] = str(max_overflow)
+    os.environ['WARMUP_CONNECTIONS'] = str(min(settings.warmup_connections, pool_size))
+    # SQL echo is the development default and costs a log line per statement.
+    os.environ.setdefault('DB_ECHO', 'false')
+    # A single worker runs in this process, where the settings have already been read.
+    config.settings = config.Settings.from_env()
+
+    logger.info('%d workers, %d+%d database connections each', args.workers, pool_size, max_overflow)
+    if args.workers > 1 and settings.rate_limit_enabled and not settings.rate_limit_redis_url:
+        logger.warning('Rate limit budgets are kept per worker; set RATE_LIMIT_REDIS_URL to share them')
+    if args.workers > 1 and settings.events_broker != 'postgres':
+        logger.warning('The change feed only sees events of its own worker; set EVENTS_BROKER=postgres')
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def run_uvicorn(args: argparse.Namespace) -> None:
+    import uvicorn
+
+    loop = 'uvloop' if _has('uvloop') else 'auto'
+    http = 'httptools' if _has('httptools') else 'auto'
+    if loop == 'auto' or http == 'auto':
+        logger.warning('uvloop/httptools are not installed, falling back to the default event loop and parser')
+
+    uvicorn.run('app.main:create_app', factory=True,
+                host=args.host, port=args.port,
+                workers=None if args.reload else args.workers,
+                reload=args.reload,
+                loop=loop, http=http,
+                limit_max_requests=args.max_requests or None,
+                timeout_graceful_shutdown=args.timeout_graceful_shutdown,
+                timeout_keep_alive=args.keep_alive,
+                log_level=args.log_level)
+
+
+def run_gunicorn(args: argparse.Namespace) -> None:
+    if not _has('uvicorn_worker'):
+        sys.exit('--server gunicorn needs the uvicorn-worker package')
+    # UvicornWorker picks uvloop and httptools by itself when they are installed.
+    argv = [sys.executable, '-m', 'gunicorn', 'app.main:create_app()',
+            '--worker-class', 'uvicorn_worker.UvicornWorker',
+            '--bind', f'{args.host}:{args.port}',
+            '--workers', str(args.workers),
+            '--max-requests', str(args.max_requests),
+            '--max-requests-jitter', str(args.max_requests_jitter),
+            '--graceful-timeout', str(args.timeout_graceful_shutdown),
+            '--keep-alive', str(args.keep_alive),
+            '--log-level', args.log_level]
+    if args.reload:
+        argv.append('--reload')
+    os.execv(sys.executable, argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper())
+    if args.reload:
+        args.workers = 1
+    try:
+        configure_environment(args)
+    except ValueError as exc:
+        sys.exit(f'error: {exc}')
+    if args.server == 'gunicorn':
+        run_gunicorn(args)
+    else:
+        run_uvicorn(args)
+
+
+if __name__ == '__main__':
+    main()
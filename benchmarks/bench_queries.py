@@ -0,0 +1,99 @@
+"""Per-query CPU cost of building and executing the hot router queries.
+
+Compares the inline `select()` constructs the routers used to build on every request,
+the same queries as `lambda_stmt`, and the prebuilt statements from `app.queries`, both executed through an ORM session the way
+the routers do it. Runs against in-memory SQLite, so the numbers are dominated by
+Python-side statement construction and cache key generation rather than by the database.
+
+    python -m benchmarks.bench_queries [--iterations N]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from app import queries
+from app.backend.db import Base
+from app.models.category import Category
+from app.models.products import Product
+from app.models.reviews import Review
+from app.models.user import User
+
+
+def _category_by_slug_lambda(i):
+    slug = f'category-{i % 10}'
+    return lambda_stmt(lambda: select(Category).where(Category.slug == slug)), {}
+
+
+def _active_products_lambda(i):
+    return lambda_stmt(lambda: select(Product).where(Product.is_active == True, Product.stock > 0)), {}
+
+
+def _active_product_by_slug_lambda(i):
+    slug = f'product-{i % 10}'
+    return lambda_stmt(lambda: select(Product).where(Product.slug == slug, Product.is_active == True,
+                                                     Product.stock > 0)), {}
+
+
+def _active_product_reviews_lambda(i):
+    product_id = i % 10
+    return lambda_stmt(lambda: select(Review).where(Review.is_active == True, Review.product_id == product_id)), {}
+
+
+# name: (inline, lambda_stmt, prebuilt). ACTIVE_PRODUCTS_IN_CATEGORIES binds an array
+# (`= ANY(...)`), which SQLite cannot execute, so it is not part of this benchmark.
+CASES = {
+    'category_by_slug': (
+        lambda i: (select(Category).where(Category.slug == f'category-{i % 10}'), {}),
+        _category_by_slug_lambda,
+        lambda i: (queries.CATEGORY_BY_SLUG, {'slug': f'category-{i % 10}'}),
+    ),
+    'active_products': (
+        lambda i: (select(Product).where(Product.is_active == True, Product.stock > 0), {}),
+        _active_products_lambda,
+        lambda i: (queries.ACTIVE_PRODUCTS, {}),
+    ),
+    'active_product_by_slug': (
+        lambda i: (select(Product).where(Product.slug == f'product-{i % 10}', Product.is_active == True,
+                                         Product.stock > 0), {}),
+        _active_product_by_slug_lambda,
+        lambda i: (queries.ACTIVE_PRODUCT_BY_SLUG, {'slug': f'product-{i % 10}'}),
+    ),
+    'active_product_reviews': (
+        lambda i: (select(Review).where(Review.is_active == True, Review.product_id == i % 10), {}),
+        _active_product_reviews_lambda,
+        lambda i: (queries.ACTIVE_PRODUCT_REVIEWS, {'product_id': i % 10}),
+    ),
+}
+
+
+def measure(session, build, iterations: int) -> float:
+    for i in range(100):
+        session.scalars(*build(i)).all()
+    start = time.process_time()
+    for i in range(iterations):
+        session.scalars(*build(i)).all()
+    return (time.process_time() - start) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine, tables=[User.__table__, Category.__table__, Product.__table__,
+                                             Review.__table__])
+
+    print(f'{"query":32} {"inline, us":>12} {"lambda, us":>12} {"prebuilt, us":>12} {"saved":>8}')
+    with Session(engine) as session:
+        for name, (inline, lambda_, prebuilt) in CASES.items():
+            before = measure(session, inline, args.iterations)
+            with_lambda = measure(session, lambda_, args.iterations)
+            after = measure(session, prebuilt, args.iterations)
+            print(f'{name:32} {before:12.1f} {with_lambda:12.1f} {after:12.1f} {1 - after / before:8.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Minimal HTTP/1.1 keep-alive load generator for throughput comparisons.
+
+    python -m benchmarks.load http://127.0.0.1:8000/products/ [--connections 32] [--duration 10]
+
+Each connection sends GET requests back to back over one socket and reads the response by
+Content-Length, so the generator itself stays cheap compared with the server.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+
+async def _worker(host: str, port: int, path: str, deadline: float, latencies: list[float], errors: list[int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: application/json\r\n\r\n'.encode()
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = int(head.split(b' ', 2)[1])
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+            if status != 200:
+                errors.append(status)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run(url: str, connections: int, duration: float) -> None:
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    latencies: list[float] = []
+    errors: list[int] = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(_worker(parts.hostname, parts.port or 80, path, deadline, latencies, errors)
+                           for _ in range(connections)))
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{len(latencies) / duration:9.0f} req/s   p50 {p50:6.1f} ms   p99 {p99:6.1f} ms   non-200: {len(errors)}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('url')
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.connections, args.duration))
+
+
+if __name__ == '__main__':
+    main()
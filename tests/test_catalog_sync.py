@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from app.backend.db import Base
+from app.models.products import Product
+from app.routers.products import _assign_slugs, _content_hash
+from app.schemas import SyncProduct
+
+
+def _item(sku: str, name: str = 'Foo', **changes) -> SyncProduct:
+    values = {'external_sku': sku, 'name': name, 'description': 'd', 'price': 100, 'image_url': 'u',
+              'stock': 1, 'category': 1}
+    return SyncProduct(**{**values, **changes})
+
+
+def _assign(items: list[SyncProduct], existing: list[dict] = (), supplier_id: int = 7) -> dict[str, str]:
+    pytest.importorskip('aiosqlite')
+    from sqlalchemy import insert
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    async def go():
+        engine = create_async_engine('sqlite+aiosqlite://')
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            if existing:
+                await connection.execute(insert(Product), list(existing))
+        async with AsyncSession(engine) as session:
+            slugs = await _assign_slugs(session, supplier_id, items)
+        await engine.dispose()
+        return slugs
+
+    return asyncio.run(go())
+
+
+def test_content_hash_ignores_sku_and_tracks_content():
+    assert _content_hash(_item('A')) == _content_hash(_item('B'))
+    assert _content_hash(_item('A')) != _content_hash(_item('A', price=101))
+
+
+def test_slugs_use_name_then_sku():
+    assert _assign([_item('A1'), _item('A2')]) == {'A1': 'foo', 'A2': 'foo-a2'}
+
+
+def test_slugs_for_skus_differing_in_case_are_unique():
+    slugs = _assign([_item(sku) for sku in ('AB', 'ab', 'Ab', 'aB')])
+    assert slugs == {'AB': 'foo', 'ab': 'foo-ab', 'Ab': 'foo-ab-2', 'aB': 'foo-ab-3'}
+
+
+def test_slugs_skip_counters_owned_by_other_products():
+    existing = [{'slug': 'foo', 'supplier_id': 1, 'external_sku': None},
+                {'slug': 'foo-ab', 'supplier_id': 1, 'external_sku': None},
+                {'slug': 'foo-ab-2', 'supplier_id': 1, 'external_sku': None}]
+    assert _assign([_item('AB')], existing) == {'AB': 'foo-ab-3'}
+
+
+def test_slugs_keep_the_products_own_slug():
+    existing = [{'slug': 'foo', 'supplier_id': 1, 'external_sku': None},
+                {'slug': 'foo-ab', 'supplier_id': 1, 'external_sku': None},
+                {'slug': 'foo-ab-2', 'supplier_id': 7, 'external_sku': 'AB'}]
+    assert _assign([_item('AB')], existing) == {'AB': 'foo-ab-2'}
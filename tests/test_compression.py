@@ -0,0 +1,91 @@
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.backend.compression import CompressedCache, CompressionMiddleware, negotiate
+
+
+def test_negotiate_picks_highest_q_value():
+    assert negotiate('gzip;q=0.5, br', ['zstd', 'br', 'gzip']) == 'br'
+    assert negotiate('GZIP', ['zstd', 'br', 'gzip']) == 'gzip'
+
+
+def test_negotiate_ties_go_to_server_order():
+    assert negotiate('gzip, br, zstd', ['zstd', 'br', 'gzip']) == 'zstd'
+    assert negotiate('*', ['br', 'gzip']) == 'br'
+
+
+def test_negotiate_honours_exclusions():
+    assert negotiate('*, br;q=0', ['br', 'gzip']) == 'gzip'
+    assert negotiate('gzip;q=0', ['gzip']) is None
+    assert negotiate('identity', ['br', 'gzip']) is None
+    assert negotiate('', ['gzip']) is None
+    assert negotiate('gzip;q=abc', ['gzip']) is None
+
+
+def test_cache_evicts_least_recently_used_by_bytes():
+    cache = CompressedCache(max_bytes=10)
+    cache.put((b'a', 'gzip'), b'1234')
+    cache.put((b'b', 'gzip'), b'1234')
+    assert cache.get((b'a', 'gzip')) == b'1234'
+
+    cache.put((b'c', 'gzip'), b'1234')
+    assert cache.get((b'b', 'gzip')) is None
+    assert cache.get((b'a', 'gzip')) == b'1234'
+    assert cache.size == 8
+
+
+def test_cache_skips_oversized_and_duplicate_bodies():
+    cache = CompressedCache(max_bytes=4)
+    cache.put((b'a', 'gzip'), b'12345')
+    assert cache.get((b'a', 'gzip')) is None
+
+    cache.put((b'a', 'gzip'), b'12')
+    cache.put((b'a', 'gzip'), b'12')
+    assert cache.size == 2
+
+
+def _client(**options) -> tuple[TestClient, CompressionMiddleware]:
+    body = 'товар ' * 1000
+
+    async def page(request):
+        return PlainTextResponse(body)
+
+    async def small(request):
+        return PlainTextResponse('ok')
+
+    async def stream(request):
+        return StreamingResponse(iter([body.encode(), body.encode()]), media_type='text/plain')
+
+    app = Starlette(routes=[Route('/page', page), Route('/small', small), Route('/stream', stream)])
+    middleware = CompressionMiddleware(app, **options)
+    return TestClient(middleware), middleware
+
+
+def test_middleware_compresses_and_caches_complete_bodies():
+    client, middleware = _client(thread_threshold=1)
+
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['vary']
+    assert response.text == 'товар ' * 1000
+    cached = middleware.cache.size
+    assert cached == int(response.headers['content-length'])
+
+    again = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert again.text == response.text and middleware.cache.size == cached
+
+
+def test_middleware_passes_small_streaming_and_identity_responses():
+    client, middleware = _client()
+
+    small = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in small.headers and small.text == 'ok'
+
+    streamed = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in streamed.headers
+
+    identity = client.get('/page', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in identity.headers
+    assert middleware.cache.size == 0
@@ -0,0 +1,95 @@
+import asyncio
+
+from app.backend.events import InProcessBroker, category_event, product_event
+
+
+def _event(category_ids: list[int] | None, type_: str = 'product.updated') -> dict:
+    return {'type': type_, 'category_ids': category_ids, 'data': {}}
+
+
+def _publish(broker: InProcessBroker, *events: dict) -> None:
+    asyncio.run(broker.publish(list(events)))
+
+
+def _drain(subscription) -> list[dict]:
+    async def go():
+        received = []
+        while True:
+            try:
+                received.append(await asyncio.wait_for(subscription.get(), 0.01))
+            except asyncio.TimeoutError:
+                return received
+            if received[-1] is None:
+                return received
+    return asyncio.run(go())
+
+
+def test_event_names_previous_category_on_move():
+    class Row:
+        id, slug, name, price, stock, category_id, is_active = 1, 'p', 'P', 1, 1, 4, True
+
+    moved = product_event('updated', Row, previous_category_id=3)
+    assert moved['categories'] == [4, 3] and moved['data']['previous_category_id'] == 3
+    assert product_event('updated', Row, previous_category_id=4)['categories'] == [4]
+
+    class Category:
+        id, slug, name, parent_id, is_active = 3, 'c', 'C', 4, True
+
+    assert category_event('updated', Category, previous_parent_id=2)['categories'] == [3, 2]
+
+
+def test_subscription_filters_on_event_ancestors():
+    broker = InProcessBroker()
+    watching = broker.subscribe({2})
+    everything = broker.subscribe()
+    _publish(broker, _event([1, 2, 3]), _event([1, 4]), _event(None, 'reset'))
+
+    assert [event['category_ids'] for event in _drain(watching)] == [[1, 2, 3], None]
+    assert len(_drain(everything)) == 3
+
+
+def test_resume_replays_history_after_last_event_id():
+    broker = InProcessBroker()
+    _publish(broker, _event([1]), _event([1]), _event([1]))
+    first, second, third = broker._history
+
+    replayed = _drain(broker.subscribe(last_event_id=first['id']))
+    assert [event['id'] for event in replayed] == [second['id'], third['id']]
+
+
+def test_resume_before_horizon_starts_with_reset():
+    broker = InProcessBroker(history=2)
+    _publish(broker, _event([1]))
+    evicted = broker._history[0]['id']
+    _publish(broker, _event([1]), _event([1]))
+
+    replayed = _drain(broker.subscribe(last_event_id=evicted - 1))
+    assert replayed[0]['type'] == 'reset'
+    assert [event['id'] for event in replayed[1:]] == [event['id'] for event in broker._history]
+
+
+def test_resume_inside_history_has_no_reset():
+    broker = InProcessBroker(history=2)
+    _publish(broker, _event([1]), _event([1]), _event([1]))
+
+    replayed = _drain(broker.subscribe(last_event_id=broker._history[0]['id']))
+    assert [event['type'] for event in replayed] == ['product.updated']
+
+
+def test_overflowed_subscription_ends_after_backlog():
+    broker = InProcessBroker(queue_size=2)
+    subscription = broker.subscribe()
+    _publish(broker, _event([1]), _event([1]), _event([1]))
+
+    received = _drain(subscription)
+    assert subscription.overflowed
+    assert len(received) == 3 and received[-1] is None
+
+
+def test_reset_subscriptions_reaches_every_subscriber():
+    broker = InProcessBroker()
+    subscriptions = [broker.subscribe({5}), broker.subscribe()]
+    broker.reset_subscriptions()
+
+    for subscription in subscriptions:
+        assert [event['type'] for event in _drain(subscription)] == ['reset']
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.backend.rate_limit import Budget, MemoryBackend, RedisBackend
+
+
+def _consume_all(backend, budget: Budget, times: int) -> list[float]:
+    async def go():
+        return [await backend.consume('login:127.0.0.1', budget) for _ in range(times)]
+    return asyncio.run(go())
+
+
+def test_memory_backend_bucket():
+    retry_after = _consume_all(MemoryBackend(), Budget(3, 1.0), 5)
+    assert retry_after[:3] == [0.0, 0.0, 0.0]
+    assert all(0.9 < value <= 1.0 for value in retry_after[3:])
+
+
+def test_redis_backend_bucket():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+
+    retry_after = _consume_all(RedisBackend(fakeredis.FakeAsyncRedis()), Budget(3, 1.0), 5)
+    assert retry_after[:3] == [0.0, 0.0, 0.0]
+    assert all(0.9 < value <= 1.0 for value in retry_after[3:])
+
+
+def test_redis_backend_fails_open():
+    class Broken:
+        def register_script(self, script):
+            async def run(**kwargs):
+                raise ConnectionError('redis is down')
+            return run
+
+    assert _consume_all(RedisBackend(Broken()), Budget(1, 1.0), 2) == [0.0, 0.0]
+    with pytest.raises(ConnectionError):
+        _consume_all(RedisBackend(Broken(), fail_open=False), Budget(1, 1.0), 1)
@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from app import queries
+from app.backend.revocation import RevocationList
+
+
+class FakeSession:
+    """Answers the incremental read with `rows` and records every statement."""
+
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.executed = []
+        self.commits = 0
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        return list(self.rows) if statement is queries.REVOCATIONS_SINCE else None
+
+    async def commit(self):
+        self.commits += 1
+
+    def deletes(self) -> int:
+        return sum(statement is not queries.REVOCATIONS_SINCE for statement, _ in self.executed)
+
+
+def test_revocation_rejects_tokens_issued_before_not_before():
+    revocations = RevocationList(token_lifetime=60)
+    revocations.add(1, 100.0)
+
+    assert revocations.is_revoked(1, 99.0)
+    assert not revocations.is_revoked(1, 100.0)
+    assert revocations.is_revoked(1, None)
+    assert not revocations.is_revoked(2, 99.0)
+
+
+def test_add_keeps_the_latest_not_before():
+    revocations = RevocationList(token_lifetime=60)
+    revocations.add(1, 100.0)
+    revocations.add(1, 50.0)
+
+    assert revocations.is_revoked(1, 99.0)
+
+
+def test_refresh_reads_incrementally_with_overlap():
+    revocations = RevocationList(token_lifetime=3600, overlap=60)
+    now = time.time()
+    db = FakeSession([(1, now - 10)])
+
+    asyncio.run(revocations.refresh(db))
+    first_since = db.executed[0][1]['since']
+    assert abs(first_since - (now - 3600)) < 5
+    assert revocations.is_revoked(1, now - 20)
+
+    asyncio.run(revocations.refresh(db))
+    second_since = db.executed[-1][1]['since']
+    assert abs(second_since - (now - 60)) < 5
+
+
+def test_refresh_drops_entries_past_token_lifetime():
+    revocations = RevocationList(token_lifetime=60)
+    revocations.add(1, time.time() - 120)
+    revocations.add(2, time.time())
+
+    asyncio.run(revocations.refresh(FakeSession()))
+
+    assert not revocations.is_revoked(1, None)
+    assert revocations.is_revoked(2, None)
+
+
+def test_refresh_prunes_the_table_once_per_interval():
+    revocations = RevocationList(token_lifetime=60, prune_interval=300)
+    db = FakeSession()
+
+    asyncio.run(revocations.refresh(db))
+    asyncio.run(revocations.refresh(db))
+    assert db.deletes() == 1 and db.commits == 1
+
+    revocations._pruned_at -= 300
+    asyncio.run(revocations.refresh(db))
+    assert db.deletes() == 2 and db.commits == 2